@@ -1,5 +1,13 @@
 # ai.py - 高性能优化版 (1.5步搜索)
-from tetris_core import Piece, convert_shape_format, valid_space
+from tetris_core import Piece, BitBoard, convert_shape_format, valid_space, drop_y
+
+from collections import OrderedDict
+
+# numpy 用于批量评分；没有安装时退回逐个评分，结果完全一样
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # --- El-Tetris 评分权重  ---
 WEIGHT_AGGREGATE_HEIGHT = -0.51
@@ -13,20 +21,24 @@ def simulate_move(grid, piece, x, r):
     """
     if x < -2 or x > 10: return False, None, 0
 
-    temp_grid = [row[:] for row in grid]
     temp_piece = Piece(x, 0, piece.shape)
     temp_piece.rotation = r
     
     if not valid_space(temp_piece, grid): return False, None, 0
     
-    # 硬降
-    while valid_space(temp_piece, grid):
-        temp_piece.y += 1
-    temp_piece.y -= 1
+    # 硬降：按列表面一次算出落点
+    temp_piece.y = drop_y(temp_piece, grid, checked=True)
     
     if temp_piece.y < 1: return False, None, 0
 
+    # 位棋盘：不需要颜色，直接按位锁定并数满行
+    if isinstance(grid, BitBoard):
+        temp_board = grid.copy(colors=False)
+        temp_board.lock(convert_shape_format(temp_piece), temp_piece.color)
+        return True, temp_board, temp_board.full_count
+
     # 写入网格
+    temp_grid = [row[:] for row in grid]
     shape_pos = convert_shape_format(temp_piece)
     for i in range(len(shape_pos)):
         px, py = shape_pos[i]
@@ -41,8 +53,15 @@ def simulate_move(grid, piece, x, r):
             
     return True, temp_grid, cleared
 
-def evaluate_grid(grid, cleared_rows):
-    """评分函数 """
+def evaluate_grid(grid, cleared_rows=0):
+    """评分函数 (grid 可以是列表网格，也可以是 BitBoard)"""
+    if isinstance(grid, BitBoard):
+        # 位棋盘的特征是增量维护的，直接读
+        return (WEIGHT_AGGREGATE_HEIGHT * grid.aggregate_height) + \
+               (WEIGHT_HOLES * grid.holes) + \
+               (WEIGHT_BUMPINESS * grid.bumpiness) + \
+               (WEIGHT_COMPLETE_LINES * cleared_rows)
+
     aggregate_height = 0
     holes = 0
     bumpiness = 0
@@ -72,22 +91,190 @@ def evaluate_grid(grid, cleared_rows):
             (WEIGHT_COMPLETE_LINES * cleared_rows)
     return score
 
-def get_best_move(grid, current_piece, next_piece=None):
+# --- 批量评分 (NumPy) ---
+USE_BATCH_EVAL = np is not None
+
+def boards_to_array(boards):
+    """把一组 BitBoard 或列表网格转成 (N, 20, 10) 的占用数组 (bool)。"""
+    if boards and isinstance(boards[0], BitBoard):
+        rows = np.array([b.rows for b in boards], dtype=np.int64)
+        return ((rows[:, :, None] >> np.arange(BitBoard.WIDTH)) & 1).astype(bool)
+    return np.array([[[c != (0,0,0) for c in row] for row in g] for g in boards], dtype=bool)
+
+def evaluate_batch(boards, cleared_rows):
+    """
+    一次性给 N 个局面打分，结果与逐个调用 evaluate_grid 完全一致。
+    boards 可以是 (N, 20, 10) 的占用数组、(N, 20) 的位棋盘行掩码数组，或 BitBoard/列表网格的列表。
+    """
+    if boards is not None and len(boards) and isinstance(boards[0], BitBoard):
+        # 位棋盘自带增量特征，直接拼成数组
+        aggregate_height = np.array([b.aggregate_height for b in boards], dtype=np.int64)
+        holes = np.array([b.holes for b in boards], dtype=np.int64)
+        bumpiness = np.array([b.bumpiness for b in boards], dtype=np.int64)
+        cleared_rows = np.asarray(cleared_rows, dtype=np.int64)
+        return (WEIGHT_AGGREGATE_HEIGHT * aggregate_height) + \
+               (WEIGHT_HOLES * holes) + \
+               (WEIGHT_BUMPINESS * bumpiness) + \
+               (WEIGHT_COMPLETE_LINES * cleared_rows)
+    if isinstance(boards, np.ndarray):
+        if boards.ndim == 2:
+            boards = ((boards.astype(np.int64)[:, :, None] >> np.arange(BitBoard.WIDTH)) & 1).astype(bool)
+        occupied = boards.astype(bool)
+    else:
+        occupied = boards_to_array(boards)
+    height = occupied.shape[1]
+    # 从顶往下做"或"累积：某格上方(含自身)出现过方块就是 True
+    covered = np.logical_or.accumulate(occupied, axis=1)
+    column_heights = covered.sum(axis=1)
+    aggregate_height = column_heights.sum(axis=1)
+    holes = (covered & ~occupied).sum(axis=(1, 2))
+    bumpiness = np.abs(np.diff(column_heights, axis=1)).sum(axis=1)
+    cleared_rows = np.asarray(cleared_rows, dtype=np.int64)
+    # 运算顺序与 evaluate_grid 相同，保证浮点结果逐位一致
+    return (WEIGHT_AGGREGATE_HEIGHT * aggregate_height) + \
+           (WEIGHT_HOLES * holes) + \
+           (WEIGHT_BUMPINESS * bumpiness) + \
+           (WEIGHT_COMPLETE_LINES * cleared_rows)
+
+# --- 置换表 (Transposition Cache) ---
+# 粗略的内存估算：一个模拟出的 BitBoard 连同评分约 400 字节
+BOARD_COST_BYTES = 400
+
+class TranspositionCache(object):
+    """
+    以 (棋盘行掩码, 方块编号) 为键缓存模拟出的全部落点和它们的评分。
+    按估算字节数做上限，超出时按 LRU 淘汰最久没用过的条目。
+    缓存里的棋盘是共享的，取出后不能修改。
+    命中主要来自相邻两次决策 (上一步复试过的局面就是这一步的初选局面)，
+    所以默认上限不大；缓存太大反而会让垃圾回收扫描变慢。
+    """
+    def __init__(self, max_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()   # key -> (value, cost)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, cost):
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._data[key] = (value, cost)
+        self.bytes += cost
+        while self.bytes > self.max_bytes and self._data:
+            _, (_, old_cost) = self._data.popitem(last=False)
+            self.bytes -= old_cost
+            self.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+        self.bytes = 0
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+# get_best_move 默认使用的全局缓存，跨调用复用；传 cache=False 可关闭
+CACHE = TranspositionCache()
+
+def _resolve_cache(cache):
+    if cache is None:
+        return CACHE
+    if cache is False:
+        return None
+    return cache
+
+def _score_boards(boards, cleared_list, batch):
+    if not boards:
+        return []
+    # BitBoard 的特征是增量维护的，逐个读比拼数组更快；numpy 只用在需要拆位/扫描的网格上
+    if batch and not isinstance(boards[0], BitBoard):
+        return evaluate_batch(boards, cleared_list).tolist()
+    return [evaluate_grid(b, c) for b, c in zip(boards, cleared_list)]
+
+def generate_placements(grid, piece, batch=None, cache=None):
+    """
+    方块在 grid 上所有合法的硬降落点及其基础分：[(x, r, 模拟后的网格, 消除行数, 基础分), ...]
+    基础分是 cleared=0 时的评分；评分公式最后一项才加消行奖励，
+    所以 基础分 + WEIGHT_COMPLETE_LINES * 消除行数 与直接 evaluate_grid 逐位相同。
+    """
+    return generate_placements_many([grid], piece, batch, cache)[0]
+
+def generate_placements_many(grids, piece, batch=None, cache=None):
+    """
+    对一组网格分别生成落点 (同 generate_placements)。
+    没命中缓存的网格先全部模拟，再合成一次批量评分；只有 BitBoard 会进缓存。
+    """
+    if batch is None:
+        batch = USE_BATCH_EVAL
+    results = [None] * len(grids)
+    keys = [None] * len(grids)
+    pending = []   # (网格序号, 落点列表)
+    for i, grid in enumerate(grids):
+        if cache is not None and isinstance(grid, BitBoard):
+            keys[i] = (tuple(grid.rows), piece.shape_id)
+            hit = cache.get(keys[i])
+            if hit is not None:
+                results[i] = hit
+                continue
+        moves = []
+        for r in range(len(piece.shape)):
+            for x in range(-2, 10):
+                valid, new_grid, cleared = simulate_move(grid, piece, x, r)
+                if valid:
+                    moves.append((x, r, new_grid, cleared))
+        pending.append((i, moves))
+
+    boards = [m[2] for _, moves in pending for m in moves]
+    bases = iter(_score_boards(boards, [0] * len(boards), batch))
+    for i, moves in pending:
+        placements = [m + (next(bases),) for m in moves]
+        results[i] = placements
+        if keys[i] is not None:
+            cache.put(keys[i], placements, BOARD_COST_BYTES * (len(placements) + 1))
+    return results
+
+def get_best_move(grid, current_piece, next_piece=None, batch=None, cache=None):
     """
     优中选优策略
+    batch=None 时有 numpy 就批量评分；两条路径给出的决策完全相同。
+    cache=None 使用全局置换表 CACHE，cache=False 关闭缓存，也可以传入自己的 TranspositionCache。
     """
+    if batch is None:
+        batch = USE_BATCH_EVAL
+    cache = _resolve_cache(cache)
     candidates = [] # 存储初选候选人
-    curr_rotations = len(current_piece.shape)
     
     # --- 第一步：全面初选 ---
-    for r1 in range(curr_rotations):
-        for x1 in range(-2, 10):
-            valid1, grid1, cleared1 = simulate_move(grid, current_piece, x1, r1)
-            if valid1:
-                # 计算基础分
-                base_score = evaluate_grid(grid1, cleared1)
-                # 将候选方案存下来：(分数, x, r, 模拟后的网格, 第一步消除数)
-                candidates.append({'score': base_score, 'x': x1, 'r': r1, 'grid': grid1, 'cleared': cleared1})
+    for x1, r1, grid1, cleared1, base1 in generate_placements(grid, current_piece, batch, cache):
+        # 计算基础分
+        score = base1 + WEIGHT_COMPLETE_LINES * cleared1
+        # 将候选方案存下来：(分数, x, r, 模拟后的网格, 第一步消除数)
+        candidates.append({'score': score, 'x': x1, 'r': r1, 'grid': grid1, 'cleared': cleared1})
     
     # 如果快死了，没路可选，就随便返回一个
     if not candidates:
@@ -106,21 +293,19 @@ def get_best_move(grid, current_piece, next_piece=None):
 
     # --- 第三步：精英复试  ---
     if next_piece:
-        next_rotations = len(next_piece.shape)
-        for cand in top_candidates:
+        # 所有复试局面一次生成、一次批量评分
+        layer2 = generate_placements_many([c['grid'] for c in top_candidates], next_piece, batch, cache)
+        for cand, placements2 in zip(top_candidates, layer2):
             max_score_layer2 = -999999
             has_valid_move_layer2 = False
             
             # 基于候选人的网格，尝试下一个方块的所有可能
-            for r2 in range(next_rotations):
-                for x2 in range(-2, 10):
-                    valid2, grid2, cleared2 = simulate_move(cand['grid'], next_piece, x2, r2)
-                    if valid2:
-                        has_valid_move_layer2 = True
-                        # 最终得分 = 两步走完后的局面分
-                        s = evaluate_grid(grid2, cand['cleared'] + cleared2)
-                        if s > max_score_layer2:
-                            max_score_layer2 = s
+            for _, _, _, cleared2, base2 in placements2:
+                has_valid_move_layer2 = True
+                # 最终得分 = 两步走完后的局面分
+                s = base2 + WEIGHT_COMPLETE_LINES * (cand['cleared'] + cleared2)
+                if s > max_score_layer2:
+                    max_score_layer2 = s
             
             # 如果这一步走完，下一步有路可走，就用复试成绩更新总成绩
             if has_valid_move_layer2:
@@ -129,4 +314,4 @@ def get_best_move(grid, current_piece, next_piece=None):
                     best_move_final = (cand['x'], cand['r'])
             # 如果下一步死棋了，这个候选人直接淘汰，不更新 best_move_final
 
-    return best_move_final
\ No newline at end of file
+    return best_move_final
@@ -0,0 +1,163 @@
+# batch_runner.py - 多进程批量跑 AI 对局，统计平均消行、得分和每秒方块数
+#
+# 用法示例：
+#   python batch_runner.py --games 1000 --workers 8 --max-pieces 500 --out results.jsonl
+#   python batch_runner.py --games 200 --out results.csv
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from game_state import GameState, DROP
+import ai
+
+RESULT_FIELDS = ['seed', 'pieces', 'lines', 'score', 'game_over', 'seconds', 'pps']
+
+def play_game(seed, max_pieces=0, level=1):
+    """用 ai.get_best_move 跑完一局 (或达到方块上限)，返回这一局的统计。max_pieces=0 表示不设上限。"""
+    state = GameState(level=level, seed=seed)
+    start = time.perf_counter()
+    while not state.game_over and (max_pieces <= 0 or state.pieces < max_pieces):
+        x, r = ai.get_best_move(state.board, state.current_piece, state.next_piece)
+        if not state.place(x, r):
+            # AI 给出的位置放不下 (已经无路可走)，直接在原地硬降结束
+            state.step(DROP)
+    seconds = time.perf_counter() - start
+    return {
+        'seed': seed,
+        'pieces': state.pieces,
+        'lines': state.lines,
+        'score': state.score,
+        'game_over': state.game_over,
+        'seconds': round(seconds, 4),
+        'pps': round(state.pieces / seconds, 2) if seconds > 0 else 0.0,
+    }
+
+def _play_game_args(args):
+    return play_game(*args)
+
+def percentile(values, q):
+    """线性插值百分位，q 取 0-100。"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+class ResultWriter(object):
+    """边跑边写：每局结束立刻写一行并 flush，中途中断也不会丢已完成的结果。"""
+    def __init__(self, path, fmt=None):
+        if fmt is None:
+            fmt = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+        self.fmt = fmt
+        self.f = open(path, 'w', newline='')
+        self.csv = None
+        if fmt == 'csv':
+            self.csv = csv.DictWriter(self.f, fieldnames=RESULT_FIELDS)
+            self.csv.writeheader()
+
+    def write(self, result):
+        if self.csv is not None:
+            self.csv.writerow(result)
+        else:
+            self.f.write(json.dumps(result) + '\n')
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+def summarize(results, wall_seconds):
+    total_pieces = sum(r['pieces'] for r in results)
+    summary = {
+        'games': len(results),
+        'wall_seconds': round(wall_seconds, 2),
+        'total_pieces': total_pieces,
+        'pieces_per_second': round(total_pieces / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+        'game_overs': sum(1 for r in results if r['game_over']),
+    }
+    for key in ('lines', 'score', 'pieces', 'pps'):
+        values = [r[key] for r in results]
+        summary[key] = {
+            'mean': round(sum(values) / len(values), 2) if values else 0.0,
+            'min': min(values) if values else 0,
+            'p25': round(percentile(values, 25), 2),
+            'p50': round(percentile(values, 50), 2),
+            'p75': round(percentile(values, 75), 2),
+            'p90': round(percentile(values, 90), 2),
+            'max': max(values) if values else 0,
+        }
+    return summary
+
+def print_summary(summary, out=sys.stdout):
+    out.write("\n=== %d games in %.1fs ===\n" % (summary['games'], summary['wall_seconds']))
+    out.write("Throughput : %.1f pieces/s (all workers), %d pieces total\n"
+              % (summary['pieces_per_second'], summary['total_pieces']))
+    out.write("Game overs : %d / %d\n" % (summary['game_overs'], summary['games']))
+    out.write("%-7s %10s %10s %10s %10s %10s %10s %10s\n" % ('', 'mean', 'min', 'p25', 'p50', 'p75', 'p90', 'max'))
+    for key in ('lines', 'score', 'pieces', 'pps'):
+        s = summary[key]
+        out.write("%-7s %10s %10s %10s %10s %10s %10s %10s\n"
+                  % (key, s['mean'], s['min'], s['p25'], s['p50'], s['p75'], s['p90'], s['max']))
+
+def run_batch(games, workers, max_pieces=0, level=1, first_seed=0, writer=None, progress=None):
+    """把 games 局种子对局分给进程池，按完成顺序写结果，返回 (结果列表, 墙钟耗时)。"""
+    jobs = [(first_seed + i, max_pieces, level) for i in range(games)]
+    results = []
+    start = time.perf_counter()
+    if workers <= 1:
+        iterator = map(_play_game_args, jobs)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        iterator = pool.imap_unordered(_play_game_args, jobs)
+    try:
+        for result in iterator:
+            results.append(result)
+            if writer is not None:
+                writer.write(result)
+            if progress is not None:
+                progress(len(results), games, result)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return results, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run seeded headless AI games over a process pool.")
+    parser.add_argument('--games', type=int, default=100, help="number of games to play")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes (1 = run inline)")
+    parser.add_argument('--max-pieces', type=int, default=1000, help="per-game piece cap, 0 = play until game over")
+    parser.add_argument('--level', type=int, default=1, help="level used for scoring")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game; game i uses seed + i")
+    parser.add_argument('--out', default='batch_results.jsonl', help="per-game results file (.jsonl or .csv)")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default=None, help="override format guessed from --out")
+    parser.add_argument('--summary-json', default=None, help="also write the aggregate summary to this file")
+    parser.add_argument('--quiet', action='store_true', help="do not print per-game progress")
+    args = parser.parse_args(argv)
+
+    def progress(done, total, result):
+        if not args.quiet:
+            print("[%d/%d] seed=%d pieces=%d lines=%d score=%d (%.1f pieces/s)"
+                  % (done, total, result['seed'], result['pieces'], result['lines'], result['score'], result['pps']))
+
+    writer = ResultWriter(args.out, args.format)
+    try:
+        results, wall = run_batch(args.games, args.workers, args.max_pieces, args.level, args.seed, writer, progress)
+    finally:
+        writer.close()
+
+    summary = summarize(results, wall)
+    print_summary(summary)
+    if args.summary_json:
+        with open(args.summary_json, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# game_state.py - 无界面游戏引擎 (不依赖 pygame)
+import random
+
+from tetris_core import Piece, BitBoard, SHAPES, valid_space, convert_shape_format, clear_rows, check_lost, drop_y
+
+# 消行得分，最终得分 = 基础分 * 等级
+BASE_POINTS = {1: 40, 2: 100, 3: 300, 4: 1200}
+
+# --- 动作 ---
+LEFT = 'left'
+RIGHT = 'right'
+DOWN = 'down'          # 软降，碰到底不会锁定
+ROTATE = 'rotate'      # 带踢墙的旋转，与 K_UP 一致
+DROP = 'drop'          # 硬降并锁定
+GRAVITY = 'gravity'    # 重力下落一格，落不下去就锁定
+ACTIONS = (LEFT, RIGHT, DOWN, ROTATE, DROP, GRAVITY)
+
+# 旋转失败时依次尝试的水平偏移 (右1, 左1, 右2, 左2)
+KICK_OFFSETS = (1, -1, 2, -2)
+
+class PieceSource(object):
+    """
+    可设种子的出块器。seed 为 None 时使用全局 random，与原来的 get_shape 行为一致。
+    """
+    def __init__(self, seed=None):
+        self.seed = seed
+        self._rng = random.Random(seed) if seed is not None else random
+
+    def next_piece(self):
+        return Piece(5, 0, self._rng.choice(SHAPES))
+
+class GameState(object):
+    """
+    一局游戏的全部规则：重力、锁定、消行、计分、出块和判负。
+    step(action) 执行一个输入动作，place(x, rotation) 直接把当前方块硬降到指定位置；
+    两者都返回当前方块是否在这一步被锁定。
+    """
+    def __init__(self, level=1, seed=None, source=None):
+        self.level = level
+        self.source = source if source is not None else PieceSource(seed)
+        self.board = BitBoard()
+        self.current_piece = self.source.next_piece()
+        self.next_piece = self.source.next_piece()
+        self.score = 0
+        self.lines = 0
+        self.pieces = 0
+        self.game_over = False
+        # 最近一次锁定消掉的行：[(y, 该行颜色), ...]，供粒子特效使用
+        self.last_cleared = []
+
+    def step(self, action):
+        if self.game_over:
+            return False
+        piece = self.current_piece
+        board = self.board
+
+        if action == LEFT or action == RIGHT:
+            dx = -1 if action == LEFT else 1
+            piece.x += dx
+            if not valid_space(piece, board): piece.x -= dx
+        elif action == DOWN:
+            piece.y += 1
+            if not valid_space(piece, board): piece.y -= 1
+        elif action == ROTATE:
+            self._rotate(piece)
+        elif action == DROP:
+            piece.y = drop_y(piece, board)
+            self._lock()
+            return True
+        elif action == GRAVITY:
+            piece.y += 1
+            if not valid_space(piece, board) and piece.y > 0:
+                piece.y -= 1
+                self._lock()
+                return True
+        else:
+            raise ValueError("unknown action: %r" % (action,))
+        return False
+
+    def place(self, x, rotation):
+        """把当前方块转到 rotation、移到 x 后硬降。位置不合法时不做任何改动并返回 False。"""
+        if self.game_over:
+            return False
+        piece = self.current_piece
+        old_x, old_rotation = piece.x, piece.rotation
+        piece.x, piece.rotation = x, rotation
+        if not valid_space(piece, self.board):
+            piece.x, piece.rotation = old_x, old_rotation
+            return False
+        return self.step(DROP)
+
+    def _rotate(self, piece):
+        board = self.board
+        piece.rotation += 1
+        if valid_space(piece, board): return
+        old_x = piece.x
+        for dx in KICK_OFFSETS:
+            piece.x = old_x + dx
+            if valid_space(piece, board): return
+        piece.x = old_x
+        piece.rotation -= 1
+
+    def _lock(self):
+        piece = self.current_piece
+        board = self.board
+        board.lock(convert_shape_format(piece), piece.color)
+        self.pieces += 1
+
+        full_rows = board.full_rows()
+        self.last_cleared = [(y, board[y][:]) for y in full_rows]
+        cleared = clear_rows(board)
+        if cleared > 0:
+            self.lines += cleared
+            self.score += BASE_POINTS.get(cleared, 0) * self.level
+
+        self.current_piece = self.next_piece
+        self.next_piece = self.source.next_piece()
+        if check_lost(board):
+            self.game_over = True
@@ -7,6 +7,7 @@ import math
 
 # 导入核心定义和 AI 模块
 from tetris_core import *
+from game_state import GameState, LEFT, RIGHT, DOWN, ROTATE, DROP, GRAVITY
 import ai
 
 # 初始化
@@ -71,11 +72,12 @@ class Particle:
             rotated_s = pygame.transform.rotate(s, self.rotation)
             surface.blit(rotated_s, (int(self.x) - rotated_s.get_width()//2, int(self.y) - rotated_s.get_height()//2))
 
-def generate_explosion_particles(full_rows, grid):
+def generate_explosion_particles(cleared_rows):
+    """cleared_rows: [(行号, 该行颜色), ...]，即 GameState.last_cleared"""
     new_particles = []
-    for r in full_rows:
+    for r, colors in cleared_rows:
         for c in range(10):
-            color = grid[r][c]
+            color = colors[c]
             if color != (0,0,0):
                 for _ in range(8):
                     start_x = TOP_LEFT_X + c * BLOCK_SIZE + BLOCK_SIZE / 2
@@ -105,15 +107,11 @@ def draw_next_shape(shape, surface):
     label = font.render('Next Shape', 1, (255,255,255))
     sx = TOP_LEFT_X + PLAY_WIDTH + 50
     sy = TOP_LEFT_Y + PLAY_HEIGHT/2 - 100
-    format = shape.shape[shape.rotation % len(shape.shape)]
-    for i, line in enumerate(format):
-        row = list(line)
-        for j, column in enumerate(row):
-            if column == '0':
-                rect_x = sx + j*BLOCK_SIZE
-                rect_y = sy + i*BLOCK_SIZE
-                pygame.draw.rect(surface, shape.color, (rect_x, rect_y, BLOCK_SIZE, BLOCK_SIZE), 0)
-                pygame.draw.rect(surface, (0,0,0), (rect_x, rect_y, BLOCK_SIZE, BLOCK_SIZE), 1)
+    for dx, dy in rotation_info(shape).cells:
+        rect_x = sx + (dx + 2)*BLOCK_SIZE
+        rect_y = sy + (dy + 4)*BLOCK_SIZE
+        pygame.draw.rect(surface, shape.color, (rect_x, rect_y, BLOCK_SIZE, BLOCK_SIZE), 0)
+        pygame.draw.rect(surface, (0,0,0), (rect_x, rect_y, BLOCK_SIZE, BLOCK_SIZE), 1)
     surface.blit(label, (sx + 10, sy - 30))
 
 def draw_window(surface, grid, score=0, last_score=0, current_piece=None):
@@ -151,9 +149,7 @@ def draw_window(surface, grid, score=0, last_score=0, current_piece=None):
     if current_piece:
         ghost = Piece(current_piece.x, current_piece.y, current_piece.shape)
         ghost.rotation = current_piece.rotation
-        while valid_space(ghost, grid):
-            ghost.y += 1
-        ghost.y -= 1
+        ghost.y = drop_y(ghost, grid)
         formatted = convert_shape_format(ghost)
         for pos in formatted:
             x, y = pos
@@ -213,21 +209,17 @@ def max_score():
 # ==========================================
 def main(win, level):
     last_score = max_score()
-    locked_positions = {}
-    grid = create_grid(locked_positions)
-    change_piece = False
+    # 规则全部交给无界面引擎，这里只负责输入、计时和绘制
+    state = GameState(level)
     run = True
     paused = False 
     ai_mode = False
     ai_timer = 0
     current_target = None
     
-    current_piece = get_shape()
-    next_piece = get_shape()
     clock = pygame.time.Clock()
     fall_time = 0
     fall_speed = get_fall_speed(level)
-    score = 0
     last_pause_time = 0 
     
     particles = []
@@ -238,8 +230,8 @@ def main(win, level):
          except: pass
 
     while run:
-        grid = create_grid(locked_positions)
         current_time = pygame.time.get_ticks()
+        locked = False
         
         if not paused:
             fall_time += clock.get_rawtime()
@@ -249,32 +241,24 @@ def main(win, level):
         if not paused:
             if fall_time/1000 > fall_speed:
                 fall_time = 0
-                current_piece.y += 1
-                if not valid_space(current_piece, grid) and current_piece.y > 0:
-                    current_piece.y -= 1
-                    change_piece = True
+                locked = state.step(GRAVITY)
 
-        if ai_mode and not paused and not change_piece:
+        if ai_mode and not paused and not locked:
             if current_target is None:
-                current_target = ai.get_best_move(grid, current_piece, next_piece)
+                current_target = ai.get_best_move(state.board, state.current_piece, state.next_piece)
             
             if ai_timer > 20: 
                 ai_timer = 0
                 target_x, target_r = current_target
+                current_piece = state.current_piece
                 if current_piece.rotation % len(current_piece.shape) != target_r:
-                    current_piece.rotation += 1
-                    if not valid_space(current_piece, grid): current_piece.rotation -= 1
+                    state.step(ROTATE)
                 elif current_piece.x < target_x:
-                    current_piece.x += 1
-                    if not valid_space(current_piece, grid): current_piece.x -= 1
+                    state.step(RIGHT)
                 elif current_piece.x > target_x:
-                    current_piece.x -= 1
-                    if not valid_space(current_piece, grid): current_piece.x += 1
+                    state.step(LEFT)
                 else:
-                    while valid_space(current_piece, grid): current_piece.y += 1
-                    current_piece.y -= 1
-                    change_piece = True
-                    current_target = None
+                    locked = state.step(DROP)
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -297,67 +281,21 @@ def main(win, level):
                     current_target = None
                 
                 if not paused and not ai_mode:
-                    if event.key == pygame.K_LEFT:
-                        current_piece.x -= 1
-                        if not valid_space(current_piece, grid): current_piece.x += 1
-                    elif event.key == pygame.K_RIGHT:
-                        current_piece.x += 1
-                        if not valid_space(current_piece, grid): current_piece.x -= 1
-                    elif event.key == pygame.K_DOWN:
-                        current_piece.y += 1
-                        if not valid_space(current_piece, grid): current_piece.y -= 1
-                    elif event.key == pygame.K_UP:
-                        old_rotation = current_piece.rotation
-                        current_piece.rotation += 1
-                        if not valid_space(current_piece, grid):
-                            current_piece.x += 1
-                            if not valid_space(current_piece, grid):
-                                current_piece.x -= 2
-                                if not valid_space(current_piece, grid):
-                                    current_piece.x += 3
-                                    if not valid_space(current_piece, grid):
-                                         current_piece.x -= 4
-                                         if not valid_space(current_piece, grid):
-                                             current_piece.x += 2
-                                             current_piece.rotation = old_rotation
+                    if event.key == pygame.K_LEFT: state.step(LEFT)
+                    elif event.key == pygame.K_RIGHT: state.step(RIGHT)
+                    elif event.key == pygame.K_DOWN: state.step(DOWN)
+                    elif event.key == pygame.K_UP: state.step(ROTATE)
                     elif event.key == pygame.K_SPACE:
-                        while valid_space(current_piece, grid): current_piece.y += 1
-                        current_piece.y -= 1
-                        change_piece = True
+                        if state.step(DROP): locked = True
 
-        if change_piece:
+        if locked:
+            current_target = None
             if FALL_SOUND: FALL_SOUND.play()
-            shape_pos = convert_shape_format(current_piece)
-            for pos in shape_pos:
-                p = (pos[0], pos[1])
-                locked_positions[p] = current_piece.color
-            
-            # --- 判断消除前，强制更新网格数据 ---
-            # 这样 clear_rows 才能看到刚刚落下的方块
-            grid = create_grid(locked_positions)
-
-            # 检查满行以生成粒子
-            full_rows = []
-            for i in range(len(grid)-1, -1, -1):
-                if (0,0,0) not in grid[i]:
-                    full_rows.append(i)
-            
-            if full_rows:
+            if state.last_cleared:
                 if CLEAR_SOUND: CLEAR_SOUND.play()
-                particles.extend(generate_explosion_particles(full_rows, grid))
-            
-            current_piece = next_piece
-            next_piece = get_shape()
-            change_piece = False
-            current_target = None
-            
-            # --- 调用消除函数 ---
-            cleared_rows = clear_rows(grid, locked_positions)
-            if cleared_rows > 0:
-                base_points = {1: 40, 2: 100, 3: 300, 4: 1200}
-                score += base_points.get(cleared_rows, 0) * level
+                particles.extend(generate_explosion_particles(state.last_cleared))
 
-        draw_window(fake_screen, grid, score, last_score, current_piece)
+        draw_window(fake_screen, state.board, state.score, last_score, state.current_piece)
         
         alive_particles = []
         for p in particles:
@@ -371,7 +309,7 @@ def main(win, level):
         if len(particles) > 250:
             particles = particles[-250:]
         
-        draw_next_shape(next_piece, fake_screen)
+        draw_next_shape(state.next_piece, fake_screen)
 
         if paused:
             overlay = pygame.Surface((S_WIDTH, S_HEIGHT))
@@ -392,13 +330,13 @@ def main(win, level):
         draw_responsive(fake_screen, win)
         pygame.display.update()
 
-        if check_lost(locked_positions):
+        if state.game_over:
             draw_text_middle(fake_screen, "YOU LOST!", 80, (255,255,255))
             draw_responsive(fake_screen, win)
             pygame.display.update()
             pygame.time.delay(1500)
             run = False
-            update_score(score)
+            update_score(state.score)
             if pygame.mixer.get_init(): pygame.mixer.music.stop()
 
 # --- 菜单 ---
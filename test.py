@@ -9,9 +9,13 @@ import pygame
 
 # --- 关键修改：从新的模块导入 ---
 # 基础逻辑现在在 tetris_core 里
-from tetris_core import create_grid, clear_rows, Piece, S, I, valid_space, S_WIDTH, S_HEIGHT
+from tetris_core import (create_grid, clear_rows, check_lost, convert_shape_format, Piece, BitBoard,
+                         SHAPES, SHAPE_TABLE, S, I, valid_space, drop_y, S_WIDTH, S_HEIGHT)
 # AI 逻辑在 ai 里
 import ai
+# 无界面游戏引擎
+from game_state import GameState
+import batch_runner
 
 class TestTetrisGame(unittest.TestCase):
 
@@ -71,6 +75,122 @@ class TestTetrisGame(unittest.TestCase):
         self.assertFalse(valid_space(piece_out_right, grid))
         print("OK")
 
+    def test_bitboard_matches_grid(self):
+        print("[Core] 测试位棋盘与列表网格结果一致...", end="")
+        locked_positions = {}
+        for x in range(10):
+            locked_positions[(x, 19)] = (255, 0, 0)
+        for x in range(4):
+            locked_positions[(x, 18)] = (0, 255, 0)
+        locked_positions[(7, 17)] = (0, 0, 255)
+
+        grid = create_grid(locked_positions)
+        board = BitBoard.from_locked(locked_positions)
+        self.assertEqual(board.to_grid(), grid)
+
+        for x in range(-3, 12):
+            for y in range(-2, 21):
+                piece = Piece(x, y, S)
+                self.assertEqual(valid_space(piece, board), valid_space(piece, grid))
+
+        self.assertEqual(ai.get_best_move(board, Piece(5, 0, I), Piece(5, 0, S)),
+                         ai.get_best_move(grid, Piece(5, 0, I), Piece(5, 0, S)))
+
+        cleared = clear_rows(board)
+        self.assertEqual(cleared, clear_rows(grid, locked_positions))
+        self.assertEqual(board.to_grid(), create_grid(locked_positions))
+        self.assertFalse(check_lost(board))
+        board.lock([(3, 0)], (255, 0, 0))
+        self.assertTrue(check_lost(board))
+        print("OK")
+
+    def test_shape_tables(self):
+        print("[Core] 测试形状预计算表...", end="")
+        grid = create_grid({})
+        for shape_id, rotations in enumerate(SHAPE_TABLE):
+            piece = Piece(0, 10, SHAPES[shape_id])
+            self.assertEqual(piece.shape_id, shape_id)
+            for r, info in enumerate(rotations):
+                piece.rotation = r
+                piece_xs = []
+                for x in range(-4, 14):
+                    piece.x = x
+                    if valid_space(piece, grid):
+                        piece_xs.append(x)
+                self.assertEqual(piece_xs, list(range(info.x_min, info.x_max + 1)))
+                self.assertEqual(len(convert_shape_format(piece)), 4)
+        print("OK")
+
+    def test_bitboard_incremental_features(self):
+        print("[Core] 测试位棋盘增量特征...", end="")
+        game = GameState(seed=21)
+        while not game.game_over and game.pieces < 120:
+            # 随便乱放，制造洞和消行
+            piece = game.current_piece
+            game.place(piece.shape_id % 8 - 1 + game.pieces % 3, game.pieces % 4)
+            board = game.board
+            grid = board.to_grid()
+            heights = []
+            holes = 0
+            for x in range(10):
+                column = [grid[y][x] != (0,0,0) for y in range(20)]
+                top = column.index(True) if True in column else 20
+                heights.append(20 - top)
+                holes += column[top:].count(False)
+            self.assertEqual(board.heights, heights)
+            self.assertEqual(board.holes, holes)
+            self.assertEqual(board.aggregate_height, sum(heights))
+            self.assertEqual(board.bumpiness, sum(abs(heights[i] - heights[i+1]) for i in range(9)))
+            self.assertEqual(board.row_counts, [sum(c != (0,0,0) for c in row) for row in grid])
+            self.assertEqual(board.lost, check_lost(board.locked_positions()) or board.topped_out)
+        self.assertGreater(game.lines, 0)
+        print("OK")
+
+    def test_drop_y_matches_stepping(self):
+        print("[Core] 测试直接计算落点...", end="")
+        locked_positions = {}
+        for x in range(10):
+            if x != 4: locked_positions[(x, 19)] = (255, 0, 0)
+        # 一个悬空的屋檐，下面还能塞方块
+        for x in range(3, 7): locked_positions[(x, 15)] = (0, 255, 0)
+        grid = create_grid(locked_positions)
+        board = BitBoard.from_locked(locked_positions)
+        for shape_id in range(len(SHAPES)):
+            for r in range(4):
+                for x in range(-2, 11):
+                    for y in range(-4, 20):
+                        piece = Piece(x, y, shape_id)
+                        piece.rotation = r
+                        expected = Piece(x, y, shape_id)
+                        expected.rotation = r
+                        while valid_space(expected, grid): expected.y += 1
+                        expected.y -= 1
+                        self.assertEqual(drop_y(piece, grid), expected.y)
+                        self.assertEqual(drop_y(piece, board), expected.y)
+        print("OK")
+
+    def test_game_state_headless(self):
+        print("[Core] 测试无界面引擎...", end="")
+        # 相同种子 + 相同落点 => 完全相同的对局
+        game_a = GameState(seed=7)
+        game_b = GameState(seed=7)
+        for _ in range(20):
+            move = ai.get_best_move(game_a.board, game_a.current_piece, game_a.next_piece)
+            self.assertTrue(game_a.place(*move))
+            self.assertTrue(game_b.place(*move))
+        self.assertEqual(game_a.board.rows, game_b.board.rows)
+        self.assertEqual(game_a.pieces, 20)
+
+        # 消一行得分 = 40 * 等级
+        game = GameState(level=2, seed=1)
+        game.board.lock([(x, 19) for x in range(1, 10)], (255, 0, 0))
+        game.current_piece = Piece(5, 0, I)
+        self.assertTrue(game.place(0, 0))
+        self.assertEqual(game.lines, 1)
+        self.assertEqual(game.score, 80)
+        self.assertEqual([y for y, _ in game.last_cleared], [19])
+        print("OK")
+
     # --- AI 逻辑测试 (New) ---
 
     def test_ai_evaluation(self):
@@ -104,6 +224,50 @@ class TestTetrisGame(unittest.TestCase):
         self.assertTrue(score_flat > score_hole, f"AI应该更喜欢平地 (Flat: {score_flat}, Hole: {score_hole})")
         print("OK")
 
+    def test_ai_batch_evaluation(self):
+        print("[AI] 测试批量评分与逐个评分一致...", end="")
+        game = GameState(seed=11)
+        boards, cleared = [], []
+        while game.pieces < 40:
+            move = ai.get_best_move(game.board, game.current_piece, game.next_piece, batch=False)
+            self.assertEqual(move, ai.get_best_move(game.board, game.current_piece, game.next_piece, batch=True))
+            game.place(*move)
+            boards.append(game.board.copy())
+            cleared.append(game.pieces % 3)
+        expected = [ai.evaluate_grid(b, c) for b, c in zip(boards, cleared)]
+        self.assertEqual(ai.evaluate_batch(boards, cleared).tolist(), expected)
+        self.assertEqual(ai.evaluate_batch([b.to_grid() for b in boards], cleared).tolist(), expected)
+        print("OK")
+
+    def test_ai_transposition_cache(self):
+        print("[AI] 测试置换表...", end="")
+        cache = ai.TranspositionCache(max_bytes=100000)
+        game = GameState(seed=5)
+        while game.pieces < 30:
+            move = ai.get_best_move(game.board, game.current_piece, game.next_piece, cache=False)
+            self.assertEqual(move, ai.get_best_move(game.board, game.current_piece, game.next_piece, cache=cache))
+            self.assertLessEqual(cache.bytes, cache.max_bytes)
+            game.place(*move)
+        stats = cache.stats()
+        self.assertGreater(stats['hits'], 0)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertEqual(stats['entries'], len(cache))
+        print("OK")
+
+    # --- 工具测试 ---
+
+    def test_batch_runner(self):
+        print("[Tools] 测试批量对局...", end="")
+        results, wall = batch_runner.run_batch(games=2, workers=1, max_pieces=15, first_seed=3)
+        self.assertEqual(sorted(r['seed'] for r in results), [3, 4])
+        self.assertTrue(all(r['pieces'] == 15 for r in results))
+        # 同一个种子结果可复现
+        self.assertEqual(batch_runner.play_game(3, 15)['score'], [r for r in results if r['seed'] == 3][0]['score'])
+        summary = batch_runner.summarize(results, wall)
+        self.assertEqual(summary['total_pieces'], 30)
+        self.assertEqual(batch_runner.percentile([1, 2, 3, 4], 50), 2.5)
+        print("OK")
+
 if __name__ == '__main__':
     print("开始运行全栈测试 (Core + AI)...")
     
@@ -40,15 +40,273 @@ T = [['.....', '..0..', '.000.', '.....', '.....'],
 
 SHAPES = [S, Z, I, O, J, L, T]
 
+# --- 形状预计算表 (导入时构建一次) ---
+class RotationInfo(object):
+    """
+    某个形状某个朝向的全部静态信息，坐标都相对于 piece.(x, y)：
+    cells      格子偏移 (dx, dy)，顺序与字符串模板逐行扫描一致
+    min_dx/max_dx, min_dy/max_dy  占用范围
+    x_min/x_max 不越过左右墙的合法 piece.x 范围
+    bottom     每一列最下面那个格子：((dx, dy), ...)，按 dx 升序
+    row_masks  每一行的位掩码 ((dy, mask), ...)，第 0 位对应 min_dx 那一列
+    """
+    __slots__ = ('cells', 'min_dx', 'max_dx', 'min_dy', 'max_dy',
+                 'x_min', 'x_max', 'bottom', 'row_masks')
+
+    def __init__(self, template):
+        cells = []
+        for i, line in enumerate(template):
+            for j, column in enumerate(line):
+                if column == '0':
+                    cells.append((j - 2, i - 4))
+        self.cells = tuple(cells)
+        xs = [dx for dx, _ in cells]
+        ys = [dy for _, dy in cells]
+        self.min_dx, self.max_dx = min(xs), max(xs)
+        self.min_dy, self.max_dy = min(ys), max(ys)
+        self.x_min = -self.min_dx
+        self.x_max = 9 - self.max_dx
+
+        lowest = {}
+        masks = {}
+        for dx, dy in cells:
+            lowest[dx] = max(lowest.get(dx, dy), dy)
+            masks[dy] = masks.get(dy, 0) | 1 << (dx - self.min_dx)
+        self.bottom = tuple(sorted(lowest.items()))
+        self.row_masks = tuple(sorted(masks.items()))
+
+# SHAPE_TABLE[shape_id][rotation] -> RotationInfo
+SHAPE_TABLE = tuple(tuple(RotationInfo(t) for t in shape) for shape in SHAPES)
+ROTATION_COUNTS = tuple(len(shape) for shape in SHAPES)
+# 用对象 id 查形状编号，避免 SHAPES.index 的线性比较
+_SHAPE_IDS = {id(shape): i for i, shape in enumerate(SHAPES)}
+
+def rotation_info(piece):
+    return SHAPE_TABLE[piece.shape_id][piece.rotation % ROTATION_COUNTS[piece.shape_id]]
+
 # --- 核心类 ---
 class Piece(object):
+    __slots__ = ('x', 'y', 'shape', 'shape_id', 'color', 'rotation')
+
     def __init__(self, x, y, shape):
+        """shape 可以是 SHAPES 里的模板，也可以直接是形状编号 (0-6)。"""
+        if isinstance(shape, int):
+            shape_id = shape
+        else:
+            shape_id = _SHAPE_IDS.get(id(shape))
+            if shape_id is None:
+                shape_id = SHAPES.index(shape)
         self.x = x
         self.y = y
-        self.shape = shape
-        self.color = SHAPE_COLORS[SHAPES.index(shape)]
+        self.shape = SHAPES[shape_id]
+        self.shape_id = shape_id
+        self.color = SHAPE_COLORS[shape_id]
         self.rotation = 0
 
+# --- 位棋盘 (Bitboard) ---
+class BitBoard(object):
+    """
+    位棋盘：rows[y] 是一个整数，第 x 位为 1 表示 (x, y) 被占用。
+    碰撞、锁定和满行检测都用位运算完成；颜色单独存在 colors 里只供渲染，
+    所以 board[y][x] 依然返回颜色，可以直接当 grid 交给绘制函数。
+    AI 模拟时可以用 copy(colors=False) 跳过颜色，此时 colors 为 None。
+    """
+    WIDTH = 10
+    HEIGHT = 20
+    FULL_ROW = (1 << WIDTH) - 1
+
+    __slots__ = ('rows', 'colors', 'topped_out', 'heights', 'row_counts', 'full_count',
+                 'holes', 'aggregate_height', 'bumpiness', 'lost')
+
+    def __init__(self, colors=True):
+        self.rows = [0] * self.HEIGHT
+        self.colors = [[(0,0,0)] * self.WIDTH for _ in range(self.HEIGHT)] if colors else None
+        # 有方块锁在了可见区域上方 (y < 0)，位棋盘存不下，只记一个标志
+        self.topped_out = False
+        # --- 增量维护的局面特征 (lock / clear_full_rows 时更新，读取都是 O(1)) ---
+        # 直接改 rows 的话这些特征就不准了，要用 from_grid / from_locked 重新建
+        self.heights = [0] * self.WIDTH        # 每列高度，空列为 0
+        self.row_counts = [0] * self.HEIGHT    # 每行已占用的格数
+        self.full_count = 0                    # 满行数
+        self.holes = 0                         # 各列表面以下的空格总数
+        self.aggregate_height = 0              # 列高之和
+        self.bumpiness = 0                     # 相邻列高差的绝对值之和
+        self.lost = False                      # 等价于 check_lost：第 0 行或更高处有方块
+
+    @classmethod
+    def from_locked(cls, locked_positions):
+        board = cls()
+        for (x, y), color in locked_positions.items():
+            board.lock(((x, y),), color)
+        return board
+
+    @classmethod
+    def from_grid(cls, grid):
+        board = cls()
+        for y in range(cls.HEIGHT):
+            for x in range(cls.WIDTH):
+                if grid[y][x] != (0,0,0):
+                    board.lock(((x, y),), grid[y][x])
+        return board
+
+    def copy(self, colors=True):
+        board = BitBoard.__new__(BitBoard)
+        board.rows = self.rows[:]
+        if colors and self.colors is not None:
+            board.colors = [row[:] for row in self.colors]
+        else:
+            board.colors = None
+        board.topped_out = self.topped_out
+        board.heights = self.heights[:]
+        board.row_counts = self.row_counts[:]
+        board.full_count = self.full_count
+        board.holes = self.holes
+        board.aggregate_height = self.aggregate_height
+        board.bumpiness = self.bumpiness
+        board.lost = self.lost
+        return board
+
+    # 让 BitBoard 可以像 grid 一样被 board[y][x] 访问
+    def __len__(self):
+        return self.HEIGHT
+
+    def __getitem__(self, y):
+        return self.colors[y]
+
+    def to_grid(self):
+        return [row[:] for row in self.colors]
+
+    def locked_positions(self):
+        locked = {}
+        for y in range(self.HEIGHT):
+            row = self.rows[y]
+            for x in range(self.WIDTH):
+                if row >> x & 1:
+                    locked[(x, y)] = self.colors[y][x] if self.colors is not None else (255, 255, 255)
+        return locked
+
+    def fits_piece(self, piece):
+        """用预计算的行掩码一次检查整行，结果与 fits(convert_shape_format(piece)) 相同。"""
+        info = rotation_info(piece)
+        x = piece.x
+        if x < info.x_min or x > info.x_max: return False
+        shift = x + info.min_dx
+        rows = self.rows
+        for dy, mask in info.row_masks:
+            y = piece.y + dy
+            if y < 0: continue
+            if y >= self.HEIGHT or rows[y] & (mask << shift): return False
+        return True
+
+    def fits(self, positions):
+        """与 valid_space 语义一致：左右越界、触底或与已有方块重叠都不合法，y < 0 的格子不检查。"""
+        rows = self.rows
+        for x, y in positions:
+            if x < 0 or x >= self.WIDTH: return False
+            if y < 0: continue
+            if y >= self.HEIGHT or rows[y] >> x & 1: return False
+        return True
+
+    def lock(self, positions, color):
+        rows = self.rows
+        heights = self.heights
+        top_limit = self.HEIGHT
+        for x, y in positions:
+            if y < 0:
+                self.topped_out = True
+                self.lost = True
+                continue
+            bit = 1 << x
+            if rows[y] & bit: continue
+            rows[y] |= bit
+            self.row_counts[y] += 1
+            if self.row_counts[y] == self.WIDTH:
+                self.full_count += 1
+            if self.colors is not None:
+                self.colors[y][x] = color
+            if y < 1:
+                self.lost = True
+
+            top = top_limit - heights[x]   # 该列最高方块所在行，空列为 HEIGHT
+            if y < top:
+                # 落在表面之上：中间隔着的空格都变成了洞
+                self.holes += top - y - 1
+                self._set_height(x, top_limit - y)
+            else:
+                # 填进了表面以下的洞
+                self.holes -= 1
+
+    def _set_height(self, x, h):
+        heights = self.heights
+        old = heights[x]
+        bump = self.bumpiness
+        if x > 0:
+            bump += abs(h - heights[x-1]) - abs(old - heights[x-1])
+        if x < self.WIDTH - 1:
+            bump += abs(h - heights[x+1]) - abs(old - heights[x+1])
+        self.bumpiness = bump
+        self.aggregate_height += h - old
+        heights[x] = h
+
+    def full_rows(self):
+        if not self.full_count:
+            return []
+        full = self.FULL_ROW
+        return [y for y, row in enumerate(self.rows) if row == full]
+
+    def clear_full_rows(self, full_rows=None):
+        """删掉满行并在顶部补空行，返回消除行数。"""
+        if full_rows is None:
+            full_rows = self.full_rows()
+        if not full_rows:
+            return 0
+        full_set = set(full_rows)
+        keep = [y for y in range(self.HEIGHT) if y not in full_set]
+        n = len(full_rows)
+        old_rows = self.rows
+
+        # 满行每一列都有方块，所以都在各列表面或以下：
+        # 表面那一格没被消掉的列，高度直接减 n，洞数不变；
+        # 表面那一格被消掉的列，往下找到新的表面，中间的空格不再算洞。
+        H = self.HEIGHT
+        heights = self.heights
+        for x in range(self.WIDTH):
+            top = H - heights[x]
+            if top not in full_set:
+                heights[x] -= n
+                continue
+            freed = 0
+            new_height = 0
+            below_cleared = n
+            for y in range(top, H):
+                if y in full_set:
+                    below_cleared -= 1
+                elif old_rows[y] >> x & 1:
+                    new_height = H - y - below_cleared
+                    break
+                else:
+                    freed += 1
+            self.holes -= freed
+            heights[x] = new_height
+        self.aggregate_height = sum(heights)
+        self.bumpiness = sum(abs(heights[i] - heights[i+1]) for i in range(self.WIDTH - 1))
+
+        self.rows = [0] * n + [old_rows[y] for y in keep]
+        self.row_counts = [0] * n + [self.row_counts[y] for y in keep]
+        self.full_count -= n
+        if self.colors is not None:
+            self.colors = [[(0,0,0)] * self.WIDTH for _ in range(n)] + [self.colors[y] for y in keep]
+        # 顶部补的是空行，只有溢出到可见区域之上的方块还算输
+        self.lost = self.topped_out
+        return n
+
+    def column_heights(self):
+        """每列高度 (空列为 0)。返回的是内部列表，调用方不要修改。"""
+        return self.heights
+
+    def count_holes(self):
+        return self.holes
+
 # --- 通用工具函数 ---
 def create_grid(locked_positions={}):
     grid = [[(0,0,0) for _ in range(10)] for _ in range(20)]
@@ -60,27 +318,60 @@ def create_grid(locked_positions={}):
     return grid
 
 def convert_shape_format(piece):
-    positions = []
-    format = piece.shape[piece.rotation % len(piece.shape)]
-    for i, line in enumerate(format):
-        row = list(line)
-        for j, column in enumerate(row):
-            if column == '0':
-                positions.append((piece.x + j - 2, piece.y + i - 4))
-    return positions
+    x, y = piece.x, piece.y
+    return [(x + dx, y + dy) for dx, dy in rotation_info(piece).cells]
 
 def valid_space(piece, grid):
-    accepted_pos = [[(j, i) for j in range(10) if grid[i][j] == (0,0,0)] for i in range(20)]
-    accepted_pos = [j for sub in accepted_pos for j in sub]
-    formatted = convert_shape_format(piece)
-    for pos in formatted:
-        x, y = pos
-        if x < 0 or x >= 10: return False
-        if pos not in accepted_pos:
-            if y > -1: return False
+    if isinstance(grid, BitBoard):
+        return grid.fits_piece(piece)
+    info = rotation_info(piece)
+    if piece.x < info.x_min or piece.x > info.x_max: return False
+    for x, y in convert_shape_format(piece):
+        if y < 0: continue
+        if y >= 20 or grid[y][x] != (0,0,0): return False
     return True
 
+def drop_y(piece, grid, checked=False):
+    """
+    直接算出方块硬降后的 y，不再逐格下落反复调用 valid_space。
+    用方块每列最底下的格子对上棋盘的列表面：方块在表面之上时一步算出距离；
+    如果方块已经钻到某列悬空部分的下面，就只在那一列往下找第一个方块。
+    结果与 "while valid_space: y += 1; y -= 1" 完全一致 (起始位置非法时同样返回 y - 1)。
+    checked=True 表示调用方已确认当前位置合法。
+    """
+    if not checked and not valid_space(piece, grid):
+        return piece.y - 1
+    x, y = piece.x, piece.y
+    heights = grid.column_heights() if isinstance(grid, BitBoard) else None
+    dist = None
+    for dx, dy in rotation_info(piece).bottom:
+        col = x + dx
+        bottom = y + dy
+        if heights is not None and bottom < 20 - heights[col]:
+            d = 20 - heights[col] - 1 - bottom
+        else:
+            d = _free_below(grid, col, bottom)
+        if dist is None or d < dist:
+            dist = d
+    return y + dist
+
+def _free_below(grid, col, bottom):
+    """第 col 列从 bottom 下一行开始连续空格的数量。"""
+    start = max(bottom + 1, 0)
+    if isinstance(grid, BitBoard):
+        rows = grid.rows
+        for r in range(start, 20):
+            if rows[r] >> col & 1:
+                return r - 1 - bottom
+    else:
+        for r in range(start, 20):
+            if grid[r][col] != (0,0,0):
+                return r - 1 - bottom
+    return 19 - bottom
+
 def check_lost(positions):
+    if isinstance(positions, BitBoard):
+        return positions.lost
     for pos in positions:
         x, y = pos
         if y < 1: return True
@@ -90,10 +381,20 @@ def get_shape():
     return Piece(5, 0, random.choice(SHAPES))
 
 # --- 消除与下落算法 🔥 ---
-def clear_rows(grid, locked):
+def clear_rows(grid, locked=None):
     """
     清除满行并精确处理上方方块的下落。
+    grid 也可以是 BitBoard：此时直接在位棋盘上消行，locked 可选（传入则同步更新）。
     """
+    if isinstance(grid, BitBoard):
+        full_rows = grid.full_rows()
+        if not full_rows:
+            return 0
+        grid.clear_full_rows(full_rows)
+        if locked is not None:
+            _shift_locked(locked, full_rows)
+        return len(full_rows)
+
     # 1. 先找出所有满行的行号（y坐标）
     full_rows = []
     for y in range(len(grid)):
@@ -104,7 +405,11 @@ def clear_rows(grid, locked):
     cleared_count = len(full_rows)
     if cleared_count == 0:
         return 0
-        
+
+    _shift_locked(locked, full_rows)
+    return cleared_count
+
+def _shift_locked(locked, full_rows):
     # 2. 从 locked 数据中彻底删除这些满行的所有方块
     for y in full_rows:
         for x in range(10):
@@ -131,5 +436,3 @@ def clear_rows(grid, locked):
     # 4. 用新的字典替换旧的字典，完成状态更新
     locked.clear()
     locked.update(new_locked)
-    
-    return cleared_count
\ No newline at end of file